@@ -20,9 +20,14 @@ OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 '''
 
-from .IOTools import unpackStream, readNullTerminatedString, calculatePadding
+from struct import Struct
+import logging
+
+from .IOTools import unpackStructStream, unpackArrayStream, calculatePadding, skipStream
 from . import A3DObjects
 
+log = logging.getLogger(__name__)
+
 '''
 A3D constants
 '''
@@ -33,6 +38,11 @@ A3D_MESHBLOCK_SIGNATURE = 2
 A3D_TRANSFORMBLOCK_SIGNATURE = 3
 A3D_OBJECTBLOCK_SIGNATURE = 5
 
+# Precompiled header formats, these are read for every block so avoid parsing the format each time
+A3D_FILEHEADER_STRUCT = Struct("<4s2H") # signature, version
+A3D_BLOCKHEADER_STRUCT = Struct("<2I") # signature, length
+A3D_COUNTEDBLOCKHEADER_STRUCT = Struct("<3I") # signature, length, item count
+
 '''
 A3D model object
 '''
@@ -47,14 +57,16 @@ class A3D:
     Main IO
     '''
     def read(self, stream):
-        # Check signature
-        signature = stream.read(4)
-        if signature != A3D_SIGNATURE:
-            raise RuntimeError(f"Invalid A3D signature: {signature}")
+        # Read the signature and file version together then check signature
+        header = stream.read(A3D_FILEHEADER_STRUCT.size)
+        if header[:4] != A3D_SIGNATURE:
+            raise RuntimeError(f"Invalid A3D signature: {header[:4]}")
+        if len(header) != A3D_FILEHEADER_STRUCT.size:
+            raise RuntimeError("Invalid A3D file header: file is truncated")
+        _, version, _ = A3D_FILEHEADER_STRUCT.unpack(header) # Likely major.minor version code
         
-        # Read file version and read version specific data
-        version, _ = unpackStream("<2H", stream) # Likely major.minor version code
-        print(f"Reading A3D version {version}")
+        # Read version specific data
+        log.debug("Reading A3D version %d", version)
         
         if version == 1:
             self.readRootBlock1(stream)
@@ -71,12 +83,12 @@ class A3D:
 
     def readRootBlock2(self, stream):
         # Verify signature
-        signature, _ = unpackStream("<2I", stream)
+        signature, _ = unpackStructStream(A3D_BLOCKHEADER_STRUCT, stream)
         if signature != A3D_ROOTBLOCK_SIGNATURE:
             raise RuntimeError(f"Invalid root data block signature: {signature}")
         
         # Read data
-        print(f"Reading root block")
+        log.debug("Reading root block")
         self.readMaterialBlock2(stream)
         self.readMeshBlock2(stream)
         self.readTransformBlock2(stream)
@@ -84,7 +96,7 @@ class A3D:
 
     def readRootBlock3(self, stream):
         # Verify signature
-        signature, length = unpackStream("<2I", stream)
+        signature, length = unpackStructStream(A3D_BLOCKHEADER_STRUCT, stream)
         if signature != A3D_ROOTBLOCK_SIGNATURE:
             raise RuntimeError(f"Invalid root data block signature: {signature}")
 
@@ -96,19 +108,19 @@ class A3D:
 
         # Padding
         padding = calculatePadding(length)
-        stream.read(padding)
+        skipStream(padding, stream)
 
     '''
     Material data blocks
     '''
     def readMaterialBlock2(self, stream):
         # Verify signature
-        signature, _, materialCount = unpackStream("<3I", stream)
+        signature, _, materialCount = unpackStructStream(A3D_COUNTEDBLOCKHEADER_STRUCT, stream)
         if signature != A3D_MATERIALBLOCK_SIGNATURE:
             raise RuntimeError(f"Invalid material data block signature: {signature}")
         
         # Read data
-        print(f"Reading material block with {materialCount} materials")
+        log.debug("Reading material block with %d materials", materialCount)
         for _ in range(materialCount):
             material = A3DObjects.A3DMaterial()
             material.read2(stream)
@@ -116,12 +128,12 @@ class A3D:
     
     def readMaterialBlock3(self, stream):
         # Verify signature
-        signature, length, materialCount = unpackStream("<3I", stream)
+        signature, length, materialCount = unpackStructStream(A3D_COUNTEDBLOCKHEADER_STRUCT, stream)
         if signature != A3D_MATERIALBLOCK_SIGNATURE:
             raise RuntimeError(f"Invalid material data block signature: {signature}")
 
         # Read data
-        print(f"Reading material block with {materialCount} materials and length {length}")
+        log.debug("Reading material block with %d materials and length %d", materialCount, length)
         for _ in range(materialCount):
             material = A3DObjects.A3DMaterial()
             material.read3(stream)
@@ -129,19 +141,19 @@ class A3D:
 
         # Padding
         padding = calculatePadding(length)
-        stream.read(padding)
+        skipStream(padding, stream)
 
     '''
     Mesh data blocks
     '''
     def readMeshBlock2(self, stream):
         # Verify signature
-        signature, _, meshCount = unpackStream("<3I", stream)
+        signature, _, meshCount = unpackStructStream(A3D_COUNTEDBLOCKHEADER_STRUCT, stream)
         if signature != A3D_MESHBLOCK_SIGNATURE:
             raise RuntimeError(f"Invalid mesh data block signature: {signature}")
 
         # Read data
-        print(f"Reading mesh block with {meshCount} meshes")
+        log.debug("Reading mesh block with %d meshes", meshCount)
         for _ in range(meshCount):
             mesh = A3DObjects.A3DMesh()
             mesh.read2(stream)
@@ -149,12 +161,12 @@ class A3D:
 
     def readMeshBlock3(self, stream):
         # Verify signature
-        signature, length, meshCount = unpackStream("<3I", stream)
+        signature, length, meshCount = unpackStructStream(A3D_COUNTEDBLOCKHEADER_STRUCT, stream)
         if signature != A3D_MESHBLOCK_SIGNATURE:
             raise RuntimeError(f"Invalid mesh data block signature: {signature}")
 
         # Read data
-        print(f"Reading mesh block with {meshCount} meshes and length {length}")
+        log.debug("Reading mesh block with %d meshes and length %d", meshCount, length)
         for _ in range(meshCount):
             mesh = A3DObjects.A3DMesh()
             mesh.read3(stream)
@@ -162,62 +174,62 @@ class A3D:
         
         # Padding
         padding = calculatePadding(length)
-        stream.read(padding)
+        skipStream(padding, stream)
 
     '''
     Transform data blocks
     '''
     def readTransformBlock2(self, stream):
         # Verify signature
-        signature, _, transformCount = unpackStream("<3I", stream)
+        signature, _, transformCount = unpackStructStream(A3D_COUNTEDBLOCKHEADER_STRUCT, stream)
         if signature != A3D_TRANSFORMBLOCK_SIGNATURE:
             raise RuntimeError(f"Invalid transform data block signature: {signature}")
 
         # Read data
-        print(f"Reading transform block with {transformCount} transforms")
+        log.debug("Reading transform block with %d transforms", transformCount)
         transforms = []
         for _ in range(transformCount):
             transform = A3DObjects.A3DTransform()
             transform.read2(stream)
             transforms.append(transform)
         # Read and assign transform ids
-        for transformI in range(transformCount):
-            transformID, = unpackStream("<I", stream)
+        transformIDs = unpackArrayStream("I", transformCount, stream)
+        for transformI, transformID in enumerate(transformIDs):
             self.transforms[transformID] = transforms[transformI]
 
     def readTransformBlock3(self, stream):
         # Verify signature
-        signature, length, transformCount = unpackStream("<3I", stream)
+        signature, length, transformCount = unpackStructStream(A3D_COUNTEDBLOCKHEADER_STRUCT, stream)
         if signature != A3D_TRANSFORMBLOCK_SIGNATURE:
             raise RuntimeError(f"Invalid transform data block signature: {signature}")
 
         # Read data
-        print(f"Reading transform block with {transformCount} transforms and length {length}")
+        log.debug("Reading transform block with %d transforms and length %d", transformCount, length)
         transforms = []
         for _ in range(transformCount):
             transform = A3DObjects.A3DTransform()
             transform.read3(stream)
             transforms.append(transform)
-        # Read and assign transform ids
+        # Skip the transform ids and assign by index
+        skipStream(4*transformCount, stream)
         for transformI in range(transformCount):
-            transformID, = unpackStream("<I", stream)
             self.transforms[transformI] = transforms[transformI] #XXX: The IDs seem to be incorrect and instead map to index?
 
         # Padding
         padding = calculatePadding(length)
-        stream.read(padding)
+        skipStream(padding, stream)
 
     '''
     Object data blocks
     '''
     def readObjectBlock2(self, stream):
         # Verify signature
-        signature, _, objectCount = unpackStream("<3I", stream)
+        signature, _, objectCount = unpackStructStream(A3D_COUNTEDBLOCKHEADER_STRUCT, stream)
         if signature != A3D_OBJECTBLOCK_SIGNATURE:
             raise RuntimeError(f"Invalid object data block signature: {signature}")
 
         # Read data
-        print(f"Reading object block with {objectCount} objects")
+        log.debug("Reading object block with %d objects", objectCount)
         for _ in range(objectCount):
             objec = A3DObjects.A3DObject()
             objec.read2(stream)
@@ -225,12 +237,12 @@ class A3D:
 
     def readObjectBlock3(self, stream):
         # Verify signature
-        signature, length, objectCount = unpackStream("<3I", stream)
+        signature, length, objectCount = unpackStructStream(A3D_COUNTEDBLOCKHEADER_STRUCT, stream)
         if signature != A3D_OBJECTBLOCK_SIGNATURE:
             raise RuntimeError(f"Invalid object data block signature: {signature}")
 
         # Read data
-        print(f"Reading object block with {objectCount} objects and length {length}")
+        log.debug("Reading object block with %d objects and length %d", objectCount, length)
         for _ in range(objectCount):
             objec = A3DObjects.A3DObject()
             objec.read3(stream)
@@ -238,4 +250,4 @@ class A3D:
 
         # Padding
         padding = calculatePadding(length)
-        stream.read(padding)
\ No newline at end of file
+        skipStream(padding, stream)
\ No newline at end of file
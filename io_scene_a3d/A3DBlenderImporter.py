@@ -20,6 +20,10 @@ OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 '''
 
+import logging
+
+import numpy as np
+
 import bpy
 from bpy_extras.node_shader_utils import PrincipledBSDFWrapper
 from bpy_extras.image_utils import load_image
@@ -30,10 +34,32 @@ from .A3DObjects import (
     A3D_VERTEXTYPE_NORMAL1,
     A3D_VERTEXTYPE_UV2,
     A3D_VERTEXTYPE_COLOR,
-    A3D_VERTEXTYPE_NORMAL2
+    A3D_VERTEXTYPE_NORMAL2,
+    A3DVertexSize
 )
 
+log = logging.getLogger(__name__)
+
+def concatenateVertexData(vertexData, vertexType):
+    # Join vertex buffers of the same type into one (vertexCount, vertexSize) float array with a single copy
+    vertexSize = A3DVertexSize[vertexType]
+    if len(vertexData) == 0:
+        return np.empty((0, vertexSize), dtype=np.float32)
+    elif len(vertexData) == 1:
+        return vertexData[0] # Usually there is only one buffer of each type so use it as is
+    return np.concatenate([np.asarray(data, dtype=np.float32).reshape(-1, vertexSize) for data in vertexData])
+
+def gatherBlenderUVs(uvs, indices):
+    # Gather the UV of every loop and flip it into blender's UV space in place, returns a flat array for foreach_set
+    loopUVs = np.take(uvs, indices, axis=0)
+    np.subtract(1.0, loopUVs[:, 1], out=loopUVs[:, 1])
+    return loopUVs.ravel()
+
 def addImageTextureToMaterial(image, node_tree):
+    # Nothing to add if the texture couldn't be loaded
+    if image is None:
+        return
+
     nodes = node_tree.nodes
     links = node_tree.links
     
@@ -46,7 +72,7 @@ def addImageTextureToMaterial(image, node_tree):
     textureNode = nodes.new(type="ShaderNodeTexImage")
     links.new(textureNode.outputs["Color"], principledBSDFNode.inputs["Base Color"])
     # Apply image
-    if image != None: textureNode.image = image
+    textureNode.image = image
 
 class A3DBlenderImporter:
     def __init__(self, modelData, directory, create_collection=True, reset_empty_transform=True, try_import_textures=True):
@@ -54,6 +80,8 @@ class A3DBlenderImporter:
         self.directory = directory
         self.materials = []
         self.meshes = []
+        self.textures = {}
+        self.materialTemplate = None
 
         # User settings
         self.create_collection = create_collection
@@ -61,12 +89,17 @@ class A3DBlenderImporter:
         self.try_import_textures = try_import_textures
 
     def importData(self):
-        print("Importing A3D model data into blender")
+        log.debug("Importing A3D model data into blender")
         
-        # Create materials
-        for materialData in self.modelData.materials:
-            ma = self.buildBlenderMaterial(materialData)
-            self.materials.append(ma)
+        # Create materials, always remove the template so it isn't left in the file if a build fails
+        try:
+            for materialData in self.modelData.materials:
+                ma = self.buildBlenderMaterial(materialData)
+                self.materials.append(ma)
+        finally:
+            if self.materialTemplate != None:
+                bpy.data.materials.remove(self.materialTemplate)
+                self.materialTemplate = None
         
         # Build meshes
         for meshData in self.modelData.meshes:
@@ -74,22 +107,44 @@ class A3DBlenderImporter:
             self.meshes.append(me)
         
         # Create objects
+        objects = []
+        for objectData in self.modelData.objects:
+            ob = self.buildBlenderObject(objectData)
+            objects.append(ob)
+
+        # Link objects once they are all built so the scene isn't updated while we are still creating data,
+        # a new collection is only added to the scene after it has been filled
         collection = bpy.context.collection # By default use the current active collection
         if self.create_collection:
             collection = bpy.data.collections.new("Object")
+        link = collection.objects.link
+        for ob in objects:
+            link(ob)
+        if self.create_collection:
             bpy.context.collection.children.link(collection)
-        for objectData in self.modelData.objects:
-            ob = self.buildBlenderObject(objectData)
-            collection.objects.link(ob)
+
+    def getTexture(self, textureName):
+        # Several objects use the same texture so only load each one once
+        if textureName in self.textures:
+            return self.textures[textureName]
+        image = load_image(textureName, self.directory, check_existing=True)
+        self.textures[textureName] = image
+        return image
 
     '''
     Blender data builders
     '''
     def buildBlenderMaterial(self, materialData):
-        ma = bpy.data.materials.new(materialData.name)
-        maWrapper = PrincipledBSDFWrapper(ma, is_readonly=False, use_nodes=True)
+        # Build the node tree once and copy it for every material, only the colour differs
+        if self.materialTemplate == None:
+            self.materialTemplate = bpy.data.materials.new("A3DMaterialTemplate")
+            maWrapper = PrincipledBSDFWrapper(self.materialTemplate, is_readonly=False, use_nodes=True)
+            maWrapper.roughness = 1.0
+
+        ma = self.materialTemplate.copy()
+        ma.name = materialData.name
+        maWrapper = PrincipledBSDFWrapper(ma, is_readonly=False)
         maWrapper.base_color = materialData.color
-        maWrapper.roughness = 1.0
         
         return ma
 
@@ -105,72 +160,55 @@ class A3DBlenderImporter:
         normal2 = []
         for vertexBuffer in meshData.vertexBuffers:
             if vertexBuffer.bufferType == A3D_VERTEXTYPE_COORDINATE:
-                coordinates += vertexBuffer.data
+                coordinates.append(vertexBuffer.data)
             elif vertexBuffer.bufferType == A3D_VERTEXTYPE_UV1:
-                uv1 += vertexBuffer.data
+                uv1.append(vertexBuffer.data)
             elif vertexBuffer.bufferType == A3D_VERTEXTYPE_NORMAL1:
-                normal1 += vertexBuffer.data
+                normal1.append(vertexBuffer.data)
             elif vertexBuffer.bufferType == A3D_VERTEXTYPE_UV2:
-                uv2 += vertexBuffer.data
+                uv2.append(vertexBuffer.data)
             elif vertexBuffer.bufferType == A3D_VERTEXTYPE_COLOR:
-                colors += vertexBuffer.data
+                colors.append(vertexBuffer.data)
             elif vertexBuffer.bufferType == A3D_VERTEXTYPE_NORMAL2:
-                normal2 += vertexBuffer.data
+                normal2.append(vertexBuffer.data)
+        coordinates = concatenateVertexData(coordinates, A3D_VERTEXTYPE_COORDINATE)
+        uv1 = concatenateVertexData(uv1, A3D_VERTEXTYPE_UV1)
+        uv2 = concatenateVertexData(uv2, A3D_VERTEXTYPE_UV2)
 
-        # Add blender vertices
-        blenderVertexIndices = []
-        blenderVertices = []
-        blenderUV1s = []
-        blenderUV2s = []
-        for submesh in meshData.submeshes:
-            polygonCount = len(submesh.indices) // 3
-            me.vertices.add(polygonCount*3)
-            me.loops.add(polygonCount*3)
-            me.polygons.add(polygonCount)
-
-            for indexI in range(submesh.indexCount):
-                index = submesh.indices[indexI]
-                blenderVertexIndices.append(indexI)
-                blenderVertices += list(coordinates[index])
-            if len(uv1) != 0:
-                for indexI in range(submesh.indexCount):
-                    index = submesh.indices[indexI]
-                    x, y = uv1[index]
-                    blenderUV1s.append((x, 1-y))
-            if len(uv2) != 0:
-                for indexI in range(submesh.indexCount):
-                    index = submesh.indices[indexI]
-                    x, y = uv2[index]
-                    blenderUV2s.append((x, 1-y))
-        me.vertices.foreach_set("co", blenderVertices)
-        me.polygons.foreach_set("loop_start", range(0, len(blenderVertices)//3, 3))
-        me.loops.foreach_set("vertex_index", blenderVertexIndices)
+        # Add blender vertices, every loop gets its own vertex
+        indices = np.zeros(0, dtype=np.int32)
+        if len(meshData.submeshes) != 0:
+            indices = np.concatenate([submesh.indices for submesh in meshData.submeshes]).astype(np.int32)
+        polygonCount = len(indices) // 3
+        me.vertices.add(polygonCount*3)
+        me.loops.add(polygonCount*3)
+        me.polygons.add(polygonCount)
+
+        indices = indices[:polygonCount*3]
+        me.vertices.foreach_set("co", coordinates[indices].ravel())
+        me.polygons.foreach_set("loop_start", np.arange(0, polygonCount*3, 3, dtype=np.int32))
+        me.loops.foreach_set("vertex_index", np.arange(polygonCount*3, dtype=np.int32))
 
         # UVs
         if len(uv1) != 0:
             uvData = me.uv_layers.new(name="UV1").data
-            for polygonI, po in enumerate(me.polygons):
-                indexI = polygonI * 3
-                uvData[po.loop_start].uv = blenderUV1s[blenderVertexIndices[indexI]]
-                uvData[po.loop_start+1].uv = blenderUV1s[blenderVertexIndices[indexI+1]]
-                uvData[po.loop_start+2].uv = blenderUV1s[blenderVertexIndices[indexI+2]]
+            uvData.foreach_set("uv", gatherBlenderUVs(uv1, indices))
         if len(uv2) != 0:
             uvData = me.uv_layers.new(name="UV2").data
-            for polygonI, po in enumerate(me.polygons):
-                indexI = polygonI * 3
-                uvData[po.loop_start].uv = blenderUV2s[blenderVertexIndices[indexI]]
-                uvData[po.loop_start+1].uv = blenderUV2s[blenderVertexIndices[indexI+1]]
-                uvData[po.loop_start+2].uv = blenderUV2s[blenderVertexIndices[indexI+2]]
+            uvData.foreach_set("uv", gatherBlenderUVs(uv2, indices))
 
         # Apply materials (version 2)
+        # Each submesh is a contiguous run of faces so fill the slot index per run and upload it in one go
+        materialIndices = np.zeros(polygonCount, dtype=np.int32)
         faceIndexBase = 0
-        for submeshI, submesh in enumerate(meshData.submeshes):
-            if submesh.materialID == None:
-                continue
-            me.materials.append(self.materials[submesh.materialID])
-            for faceI in range(submesh.indexCount//3):
-                me.polygons[faceI+faceIndexBase].material_index = submeshI
-            faceIndexBase += submesh.indexCount//3
+        for submesh in meshData.submeshes:
+            faceCount = submesh.indexCount//3
+            if submesh.materialID != None:
+                materialIndices[faceIndexBase:faceIndexBase+faceCount] = len(me.materials)
+                me.materials.append(self.materials[submesh.materialID])
+            faceIndexBase += faceCount
+        if len(me.materials) != 0:
+            me.polygons.foreach_set("material_index", materialIndices)
 
         # Finalise
         me.validate()
@@ -182,14 +220,20 @@ class A3DBlenderImporter:
         mesh = self.modelData.meshes[objectData.meshID]
         transform = self.modelData.transforms[objectData.transformID]
 
-        # Apply materials to mesh (version 3)
+        # Gather object materials (version 3)
+        materials = []
         for materialID in objectData.materialIDs:
             if materialID == -1:
                 continue
-            me.materials.append(self.materials[materialID])
+            materials.append(self.materials[materialID])
+        # The materials get linked to the object, the mesh only needs enough empty slots for them
+        # so that objects sharing a mesh don't pile their materials onto it
+        while len(me.materials) < len(materials):
+            me.materials.append(None)
         # Set the default material to the first one we added
-        for polygon in me.polygons:
-            polygon.material_index = 0
+        # (version 2 objects have no material IDs, keep the per submesh materials from buildBlenderMesh)
+        if len(objectData.materialIDs) != 0:
+            me.polygons.foreach_set("material_index", np.zeros(len(me.polygons), dtype=np.int32))
 
         # Select a name for the blender object
         #XXX: review this, maybe we should just stick to the name we are given
@@ -203,43 +247,49 @@ class A3DBlenderImporter:
 
         # Create the object
         ob = bpy.data.objects.new(name, me)
+        for slotI, ma in enumerate(materials):
+            ob.material_slots[slotI].link = "OBJECT"
+            ob.material_slots[slotI].material = ma
 
         # Set transform
-        ob.location = transform.position
-        ob.scale = transform.scale
-        ob.rotation_mode = "QUATERNION"
+        position = transform.position
+        scale = transform.scale
         x, y, z, w = transform.rotation
-        ob.rotation_quaternion = (w, x, y, z)
+        rotation = (w, x, y, z)
         if self.reset_empty_transform:
-            if transform.scale == (0.0, 0.0, 0.0): ob.scale = (1.0, 1.0, 1.0)
-            if transform.rotation == (0.0, 0.0, 0.0, 0.0): ob.rotation_quaternion = (1.0, 0.0, 0.0, 0.0)
+            if scale == (0.0, 0.0, 0.0): scale = (1.0, 1.0, 1.0)
+            if rotation == (0.0, 0.0, 0.0, 0.0): rotation = (1.0, 0.0, 0.0, 0.0)
+        ob.rotation_mode = "QUATERNION"
+        ob.location = position
+        ob.rotation_quaternion = rotation
+        ob.scale = scale
 
         # Attempt to load textures
-        if self.try_import_textures and len(me.materials) != 0:
-            ma = me.materials[0] # Assume this is the main material
+        if self.try_import_textures and len(ob.material_slots) != 0 and ob.material_slots[0].material != None:
+            ma = ob.material_slots[0].material # Assume this is the main material
             name = name.lower()
             if name == "hull" or name == "turret":
                 # lightmap.webp
-                print("Load lightmap")
+                log.debug("Load lightmap")
                 
                 # Load image
-                image = load_image("lightmap.webp", self.directory, check_existing=True)
+                image = self.getTexture("lightmap.webp")
                 # Apply image
                 addImageTextureToMaterial(image, ma.node_tree)
             elif "track" in name:
                 # tracks.webp
-                print("Load tracks")
+                log.debug("Load tracks")
 
                 # Load image
-                image = load_image("tracks.webp", self.directory, check_existing=True)
+                image = self.getTexture("tracks.webp")
                 # Apply image
                 addImageTextureToMaterial(image, ma.node_tree)
             elif "wheel" in name:
                 # wheels.webp
-                print("Load wheels")
+                log.debug("Load wheels")
 
                 # Load image
-                image = load_image("wheels.webp", self.directory, check_existing=True)
+                image = self.getTexture("wheels.webp")
                 # Apply image
                 addImageTextureToMaterial(image, ma.node_tree)
 
@@ -20,9 +20,18 @@ OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 '''
 
-from .IOTools import unpackStream, readNullTerminatedString, readLengthPrefixedString, calculatePadding
+from struct import Struct
+import logging
+
+import numpy as np
+
+from .IOTools import unpackStream, unpackStructStream, unpackArrayStream, readUInt32, readNullTerminatedString, readLengthPrefixedString, calculatePadding, skipStream
+
+log = logging.getLogger(__name__)
 
 class A3DMaterial:
+    __slots__ = ("name", "color", "diffuseMap")
+
     def __init__(self):
         self.name = ""
         self.color = (0.0, 0.0, 0.0)
@@ -33,16 +42,18 @@ class A3DMaterial:
         self.color = unpackStream("<3f", stream)
         self.diffuseMap = readNullTerminatedString(stream)
 
-        print(f"[A3DMaterial name: {self.name} color: {self.color} diffuse map: {self.diffuseMap}]")
+        log.debug("[A3DMaterial name: %s color: %s diffuse map: %s]", self.name, self.color, self.diffuseMap)
 
     def read3(self, stream):
         self.name = readLengthPrefixedString(stream)
         self.color = unpackStream("<3f", stream)
         self.diffuseMap = readLengthPrefixedString(stream)
 
-        print(f"[A3DMaterial name: {self.name} color: {self.color} diffuse map: {self.diffuseMap}]")
+        log.debug("[A3DMaterial name: %s color: %s diffuse map: %s]", self.name, self.color, self.diffuseMap)
 
 class A3DMesh:
+    __slots__ = ("name", "bboxMax", "bboxMin", "vertexBuffers", "submeshes", "vertexCount", "vertexBufferCount", "submeshCount")
+
     def __init__(self):
         self.name = ""
         self.bboxMax = None
@@ -57,19 +68,21 @@ class A3DMesh:
     def read2(self, stream):
         # Read vertex buffers
         self.vertexCount, self.vertexBufferCount = unpackStream("<2I", stream)
-        for _ in range(self.vertexBufferCount):
+        self.vertexBuffers = [None] * self.vertexBufferCount
+        for vertexBufferI in range(self.vertexBufferCount):
             vertexBuffer = A3DVertexBuffer()
             vertexBuffer.read2(self.vertexCount, stream)
-            self.vertexBuffers.append(vertexBuffer)
+            self.vertexBuffers[vertexBufferI] = vertexBuffer
         
         # Read submeshes
-        self.submeshCount, = unpackStream("<I", stream)
-        for _ in range(self.submeshCount):
+        self.submeshCount = readUInt32(stream)
+        self.submeshes = [None] * self.submeshCount
+        for submeshI in range(self.submeshCount):
             submesh = A3DSubmesh()
             submesh.read2(stream)
-            self.submeshes.append(submesh)
+            self.submeshes[submeshI] = submesh
         
-        print(f"[A3DMesh name: {self.name} bbox max: {self.bboxMax} bbox min: {self.bboxMin} vertex buffers: {len(self.vertexBuffers)} submeshes: {len(self.submeshes)}]")
+        log.debug("[A3DMesh name: %s bbox max: %s bbox min: %s vertex buffers: %s submeshes: %s]", self.name, self.bboxMax, self.bboxMin, len(self.vertexBuffers), len(self.submeshes))
     
     def read3(self, stream):
         # Read mesh info
@@ -77,23 +90,25 @@ class A3DMesh:
         # XXX: bbox order maybe incorrect, check this (might be min then max and not max then min)
         self.bboxMax = unpackStream("<3f", stream)
         self.bboxMin = unpackStream("<3f", stream)
-        stream.read(4) # XXX: Unknown float value
+        skipStream(4, stream) # XXX: Unknown float value
 
         # Read vertex buffers
         self.vertexCount, self.vertexBufferCount = unpackStream("<2I", stream)
-        for _ in range(self.vertexBufferCount):
+        self.vertexBuffers = [None] * self.vertexBufferCount
+        for vertexBufferI in range(self.vertexBufferCount):
             vertexBuffer = A3DVertexBuffer()
             vertexBuffer.read2(self.vertexCount, stream)
-            self.vertexBuffers.append(vertexBuffer)
+            self.vertexBuffers[vertexBufferI] = vertexBuffer
         
         # Read submeshes
-        self.submeshCount, = unpackStream("<I", stream)
-        for _ in range(self.submeshCount):
+        self.submeshCount = readUInt32(stream)
+        self.submeshes = [None] * self.submeshCount
+        for submeshI in range(self.submeshCount):
             submesh = A3DSubmesh()
             submesh.read3(stream)
-            self.submeshes.append(submesh)
+            self.submeshes[submeshI] = submesh
         
-        print(f"[A3DMesh name: {self.name} bbox max: {self.bboxMax} bbox min: {self.bboxMin} vertex buffers: {len(self.vertexBuffers)} submeshes: {len(self.submeshes)}]")
+        log.debug("[A3DMesh name: %s bbox max: %s bbox min: %s vertex buffers: %s submeshes: %s]", self.name, self.bboxMax, self.bboxMin, len(self.vertexBuffers), len(self.submeshes))
 
 A3D_VERTEXTYPE_COORDINATE = 1
 A3D_VERTEXTYPE_UV1 = 2
@@ -111,22 +126,26 @@ A3DVertexSize = {
     A3D_VERTEXTYPE_NORMAL2: 3
 }
 class A3DVertexBuffer:
+    __slots__ = ("data", "bufferType")
+
     def __init__(self):
-        self.data = []
+        self.data = None # (vertexCount, vertexSize) float32 array
         self.bufferType = None
 
     def read2(self, vertexCount, stream):
-        self.bufferType, = unpackStream("<I", stream)
+        self.bufferType = readUInt32(stream)
         if not (self.bufferType in A3DVertexSize.keys()):
             raise RuntimeError(f"Unknown vertex buffer type: {self.bufferType}")
-        for _ in range(vertexCount):
-            vertexSize = A3DVertexSize[self.bufferType]
-            vertex = unpackStream(f"<{vertexSize}f", stream)
-            self.data.append(vertex)
+        # Read the whole buffer at once as a (vertexCount, vertexSize) float array
+        vertexSize = A3DVertexSize[self.bufferType]
+        data = stream.read(vertexCount * vertexSize * 4)
+        self.data = np.frombuffer(data, dtype="<f4").reshape(vertexCount, vertexSize)
         
-        print(f"[A3DVertexBuffer data: {len(self.data)} buffer type: {self.bufferType}]")
+        log.debug("[A3DVertexBuffer data: %s buffer type: %s]", len(self.data), self.bufferType)
 
 class A3DSubmesh:
+    __slots__ = ("indices", "smoothingGroups", "materialID", "indexCount")
+
     def __init__(self):
         self.indices = []
         self.smoothingGroups = []
@@ -135,26 +154,30 @@ class A3DSubmesh:
         self.indexCount = 0
 
     def read2(self, stream):
-        self.indexCount, = unpackStream("<I", stream) # This is just the face count so multiply it by 3
+        self.indexCount = readUInt32(stream) # This is just the face count so multiply it by 3
         self.indexCount *= 3
-        self.indices = list(unpackStream(f"<{self.indexCount}H", stream))
-        self.smoothingGroups = list(unpackStream(f"<{self.indexCount//3}I", stream))
+        self.indices = np.frombuffer(stream.read(self.indexCount*2), dtype="<u2")
+        self.smoothingGroups = np.frombuffer(stream.read((self.indexCount//3)*4), dtype="<u4")
         self.materialID, = unpackStream("<H", stream)
 
-        print(f"[A3DSubmesh indices: {len(self.indices)} smoothing groups: {len(self.smoothingGroups)} materialID: {self.materialID}]")
+        log.debug("[A3DSubmesh indices: %s smoothing groups: %s materialID: %s]", len(self.indices), len(self.smoothingGroups), self.materialID)
 
     def read3(self, stream):
         # Read indices
-        self.indexCount, = unpackStream("<I", stream)
-        self.indices = list(unpackStream(f"<{self.indexCount}H", stream))
+        self.indexCount = readUInt32(stream)
+        self.indices = np.frombuffer(stream.read(self.indexCount*2), dtype="<u2")
         
         # Padding
         padding = calculatePadding(self.indexCount*2) # Each index is 2 bytes
-        stream.read(padding)
+        skipStream(padding, stream)
 
-        print(f"[A3DSubmesh indices: {len(self.indices)} smoothing groups: {len(self.smoothingGroups)} materialID: {self.materialID}]")
+        log.debug("[A3DSubmesh indices: %s smoothing groups: %s materialID: %s]", len(self.indices), len(self.smoothingGroups), self.materialID)
 
+# position, rotation, scale
+A3DTRANSFORM_STRUCT = Struct("<3f4f3f")
 class A3DTransform:
+    __slots__ = ("name", "position", "rotation", "scale")
+
     def __init__(self):
         self.name = ""
         self.position = (0.0, 0.0, 0.0)
@@ -162,21 +185,25 @@ class A3DTransform:
         self.scale = (0.0, 0.0, 0.0)
 
     def read2(self, stream):
-        self.position = unpackStream("<3f", stream)
-        self.rotation = unpackStream("<4f", stream)
-        self.scale = unpackStream("<3f", stream)
+        transform = unpackStructStream(A3DTRANSFORM_STRUCT, stream)
+        self.position = transform[0:3]
+        self.rotation = transform[3:7]
+        self.scale = transform[7:10]
 
-        print(f"[A3DTransform position: {self.position} rotation: {self.rotation} scale: {self.scale}]")
+        log.debug("[A3DTransform position: %s rotation: %s scale: %s]", self.position, self.rotation, self.scale)
 
     def read3(self, stream):
         self.name = readLengthPrefixedString(stream)
-        self.position = unpackStream("<3f", stream)
-        self.rotation = unpackStream("<4f", stream)
-        self.scale = unpackStream("<3f", stream)
+        transform = unpackStructStream(A3DTRANSFORM_STRUCT, stream)
+        self.position = transform[0:3]
+        self.rotation = transform[3:7]
+        self.scale = transform[7:10]
 
-        print(f"[A3DTransform name: {self.name} position: {self.position} rotation: {self.rotation} scale: {self.scale}]")
+        log.debug("[A3DTransform name: %s position: %s rotation: %s scale: %s]", self.name, self.position, self.rotation, self.scale)
 
 class A3DObject:
+    __slots__ = ("name", "meshID", "transformID", "materialIDs", "materialCount")
+
     def __init__(self):
         self.name = ""
         self.meshID = None
@@ -189,14 +216,12 @@ class A3DObject:
         self.name = readNullTerminatedString(stream)
         self.meshID, self.transformID = unpackStream("<2I", stream)
 
-        print(f"[A3DObject name: {self.name} meshID: {self.meshID} transformID: {self.transformID} materialIDs: {len(self.materialIDs)}]")
+        log.debug("[A3DObject name: %s meshID: %s transformID: %s materialIDs: %s]", self.name, self.meshID, self.transformID, len(self.materialIDs))
 
     def read3(self, stream):
         self.meshID, self.transformID, self.materialCount = unpackStream("<3I", stream)
 
         # Read material IDs
-        for _ in range(self.materialCount):
-            materialID, = unpackStream("<i", stream)
-            self.materialIDs.append(materialID)
+        self.materialIDs = unpackArrayStream("i", self.materialCount, stream).tolist()
 
-        print(f"[A3DObject name: {self.name} meshID: {self.meshID} transformID: {self.transformID} materialIDs: {len(self.materialIDs)}]")
\ No newline at end of file
+        log.debug("[A3DObject name: %s meshID: %s transformID: %s materialIDs: %s]", self.name, self.meshID, self.transformID, len(self.materialIDs))
\ No newline at end of file
@@ -20,20 +20,75 @@ OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 '''
 
-from struct import unpack, calcsize
+from struct import Struct
+from functools import lru_cache
+from array import array
+from sys import byteorder, intern
+
+@lru_cache(maxsize=64)
+def getStruct(format):
+    # Compile each format once, the same handful of formats are used for every record
+    return Struct(format)
 
 def unpackStream(format, stream):
-    size = calcsize(format)
-    data = stream.read(size)
-    return unpack(format, data)
+    structure = getStruct(format)
+    data = stream.read(structure.size)
+    return structure.unpack(data)
+
+def unpackStructStream(structure, stream):
+    # Same as unpackStream but takes a precompiled struct.Struct so the format isn't parsed again
+    data = stream.read(structure.size)
+    return structure.unpack(data)
+
+UINT32_STRUCT = Struct("<I")
+def readUInt32(stream):
+    # Single u32 reads are common enough to skip the format parsing in unpackStream
+    value, = UINT32_STRUCT.unpack(stream.read(4))
+    return value
+
+def unpackArrayStream(typecode, count, stream):
+    # Bulk read a homogeneous little endian array in a single call, much faster than unpacking each item
+    data = array(typecode)
+    data.frombytes(stream.read(data.itemsize * count))
+    if byteorder == "big":
+        data.byteswap()
+    return data
+
+def skipStream(count, stream):
+    # Seek past data we don't need instead of reading it into a throwaway bytes object
+    try:
+        stream.seek(count, 1)
+    except (AttributeError, OSError):
+        stream.read(count)
+
+@lru_cache(maxsize=1024)
+def decodeString(data):
+    # Material, mesh and texture names repeat a lot so decode each name once and share the same str
+    return intern(data.decode("utf8", errors="ignore"))
 
 def readNullTerminatedString(stream):
     string = b""
-    char = stream.read(1)
-    while char != b"\x00":
-        string += char
+    # Plain reader objects may not have seekable() at all, read those a byte at a time
+    seekable = getattr(stream, "seekable", None)
+    if seekable == None or not seekable():
         char = stream.read(1)
-    return string.decode("utf8", errors="ignore")
+        while char != b"\x00" and char != b"":
+            string += char
+            char = stream.read(1)
+        return decodeString(string)
+
+    # Search for the terminator a chunk at a time then seek back to just after it
+    while True:
+        chunk = stream.read(64)
+        terminatorI = chunk.find(b"\x00")
+        if terminatorI != -1:
+            string += chunk[:terminatorI]
+            stream.seek(terminatorI + 1 - len(chunk), 1)
+            break
+        elif chunk == b"":
+            break
+        string += chunk
+    return decodeString(string)
 
 def calculatePadding(length):
     # (it basically works with rounding)
@@ -41,10 +96,10 @@ def calculatePadding(length):
     return paddingSize
 
 def readLengthPrefixedString(stream):
-    length, = unpackStream("<I", stream)
+    length = readUInt32(stream)
     string = stream.read(length)
 
     paddingSize = calculatePadding(length)
-    stream.read(paddingSize)
+    skipStream(paddingSize, stream)
 
-    return string.decode("utf8", errors="ignore")
\ No newline at end of file
+    return decodeString(string)
\ No newline at end of file
@@ -20,13 +20,40 @@ OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 '''
 
+from io import BytesIO
+from os import stat
+from os.path import isfile
+from functools import lru_cache
+from time import perf_counter
+import logging
+
 import bpy
 from bpy.types import Operator
 from bpy.props import StringProperty, BoolProperty
 from bpy_extras.io_utils import ImportHelper
 
-from .A3D import A3D
-from .A3DBlenderImporter import A3DBlenderImporter
+log = logging.getLogger(__name__)
+
+'''
+File loading
+'''
+@lru_cache(maxsize=1)
+def readA3DFile(filepath, modifiedTime, fileSize):
+    # Cached on the file's modification time and size so re-importing an unchanged file skips parsing it,
+    # only the last model is kept since a parsed model holds all of its vertex data
+    from .A3D import A3D
+
+    log.debug("Reading A3D data from %s", filepath)
+    modelData = A3D()
+    with open(filepath, "rb") as file:
+        data = file.read()
+    # Parse from memory, the reader does many small reads
+    modelData.read(BytesIO(data))
+    return modelData
+
+def loadA3DFile(filepath):
+    fileStat = stat(filepath)
+    return readA3DFile(filepath, fileStat.st_mtime_ns, fileStat.st_size)
 
 '''
 Operators
@@ -53,17 +80,26 @@ class ImportA3D(Operator, ImportHelper):
 
     def execute(self, context):
         filepath = self.filepath
+        # Fail before loading the importer modules if there is nothing to read
+        if not isfile(filepath):
+            self.report({'ERROR'}, f"File not found: {filepath}")
+            return {"CANCELLED"}
+
+        # Imported here so registering the add-on doesn't load the importer (and numpy) until it is used
+        from .A3DBlenderImporter import A3DBlenderImporter
+
+        importStartTime = perf_counter()
         
         # Read the file
-        print(f"Reading A3D data from {filepath}")
-        modelData = A3D()
-        with open(filepath, "rb") as file:
-            modelData.read(file)
+        modelData = loadA3DFile(filepath)
+        readEndTime = perf_counter()
         
         # Import data into blender
         modelImporter = A3DBlenderImporter(modelData, self.directory, self.create_collection, self.reset_empty_transform, self.try_import_textures)
         modelImporter.importData()
+        importEndTime = perf_counter()
 
+        self.report({'INFO'}, f"Imported {len(modelData.objects)} objects in {importEndTime-importStartTime:.2f}s (read {readEndTime-importStartTime:.2f}s, import {importEndTime-readEndTime:.2f}s)")
         return {"FINISHED"}
 
 '''
@@ -96,6 +132,7 @@ def unregister():
     for c in classes:
         bpy.utils.unregister_class(c)
     bpy.types.TOPBAR_MT_file_import.remove(menu_func_import_a3d)
+    readA3DFile.cache_clear()
 
 if __name__ == "__main__":
     register()
\ No newline at end of file